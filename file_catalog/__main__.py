@@ -33,7 +33,10 @@ def main():
                db_auth_source=config['MONGODB_AUTH_SOURCE_DB'],
                db_user=config.get('MONGODB_AUTH_USER', None),
                db_pass=config.get('MONGODB_AUTH_PASS', None),
-               db_uri=config.get('MONGODB_URI', None)).run()
+               db_uri=config.get('MONGODB_URI', None),
+               db_max_pool_size=config['MONGODB_MAX_POOL_SIZE'],
+               db_min_pool_size=config['MONGODB_MIN_POOL_SIZE'],
+               db_wait_queue_timeout_ms=config['MONGODB_WAIT_QUEUE_TIMEOUT_MS']).run()
     except Exception:
         logging.fatal('Server error', exc_info=True)
         raise
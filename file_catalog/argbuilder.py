@@ -3,8 +3,11 @@
 
 from typing import Any, Dict, Optional, Union
 
+import orjson
 from file_catalog.mongo import AllKeys
-from tornado.escape import json_decode
+
+# errors raised for malformed args, by `urlargparse.parse()` & the `build_*()` functions
+ARG_ERRORS = (AttributeError, IndexError, KeyError, TypeError, ValueError)
 
 
 def build_limit(kwargs: Dict[str, Any], config: Dict[str, Any]) -> None:
@@ -12,7 +15,7 @@ def build_limit(kwargs: Dict[str, Any], config: Dict[str, Any]) -> None:
     if "limit" in kwargs:
         kwargs["limit"] = int(kwargs["limit"])
         if kwargs["limit"] < 1:
-            raise Exception("limit is not positive")
+            raise ValueError("limit is not positive")
 
         # check with config
         if kwargs["limit"] > config["FC_QUERY_FILE_LIST_LIMIT"]:
@@ -27,7 +30,7 @@ def build_start(kwargs: Dict[str, Any]) -> None:
     if "start" in kwargs:
         kwargs["start"] = int(kwargs["start"])
         if kwargs["start"] < 0:
-            raise Exception("start is negative")
+            raise ValueError("start is negative")
 
 
 def _resolve_path_args(kwargs: Dict[str, Any]) -> Optional[Union[Dict[str, Any], str]]:
@@ -66,7 +69,7 @@ def build_files_query(kwargs: Dict[str, Any]) -> None:
     if "query" in kwargs:
         # keep whatever was already in here, then add to it
         if isinstance(kwargs["query"], (str, bytes)):
-            query = json_decode(kwargs.pop("query"))
+            query = orjson.loads(kwargs.pop("query"))
         else:
             query = kwargs.pop("query")
     else:
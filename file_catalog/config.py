@@ -32,6 +32,9 @@ class Config(dict):
             int,
             'Maximal number of files that are returned in the file list by the server',
         ),
+        'FC_SNAPSHOT_CACHE_MAX_FILES': ConfigParamSpec(
+            250000, int, 'Max number of file uuids (summed over snapshots) kept in the in-process snapshot cache'
+        ),
         'MONGODB_AUTH_PASS': ConfigParamSpec(
             None, str, 'MongoDB authentication password'
         ),
@@ -42,8 +45,17 @@ class Config(dict):
             None, str, 'MongoDB authentication username'
         ),
         'MONGODB_HOST': ConfigParamSpec('localhost', str, 'MongoDB host'),
+        'MONGODB_MAX_POOL_SIZE': ConfigParamSpec(
+            100, int, 'Max number of connections in the (shared) MongoDB connection pool'
+        ),
+        'MONGODB_MIN_POOL_SIZE': ConfigParamSpec(
+            10, int, 'Number of MongoDB connections kept open, even when idle'
+        ),
         'MONGODB_PORT': ConfigParamSpec(27017, int, 'MongoDB port'),
         'MONGODB_URI': ConfigParamSpec(None, str, 'MongoDB URI'),
+        'MONGODB_WAIT_QUEUE_TIMEOUT_MS': ConfigParamSpec(
+            None, int, 'Milliseconds to wait for a free pooled connection before erroring (default: no limit)'
+        ),
         'META_FORBIDDEN_FIELDS_CREATION': ConfigParamSpec(
             ['mongo_id', '_id', 'meta_modify_date'],
             str.split,
@@ -4,26 +4,92 @@
 from __future__ import absolute_import, division, print_function
 
 import asyncio
-import datetime
 import logging
-from concurrent.futures import ThreadPoolExecutor
-from typing import Any, Dict, List, Optional, Union, cast
+import time
+import weakref
+from collections import OrderedDict
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, AsyncIterator, Dict, List, Mapping, Optional, Tuple, Union, cast
 
 import pymongo  # type: ignore[import]
+import pymongo.errors  # type: ignore[import]
+from pymongo import ReturnDocument, UpdateOne  # type: ignore[import]
 from motor.motor_tornado import MotorClient  # type: ignore[import]
 from motor.motor_tornado import MotorCursor
+from tornado.ioloop import IOLoop
 
 from .schema import types
 
 logger = logging.getLogger("mongo")
 
+# upper bound on documents buffered per cursor round-trip
+MAX_BATCH_SIZE = 1000
+
+# default max number of file uuids (summed over snapshots) kept by `get_snapshot_by_uuid()`
+SNAPSHOT_CACHE_MAX_FILES = 250000
+
+# fields included by `find_files()`/`stream_files()` when no `keys` are given
+FILES_DEFAULT_KEYS = {"uuid": True, "logical_name": True}
+
+
+@lru_cache(maxsize=128)
+def _cached_projection(fields: Tuple[Tuple[str, bool], ...]) -> Mapping[str, bool]:
+    """Build a projection once per distinct set of `fields`."""
+    projection = {"_id": False}
+    projection.update(fields)
+    return MappingProxyType(projection)
+
+
+# one MotorClient (connection pool & monitor tasks) per IOLoop & distinct set of client args
+# weak values: a client is only cached while some `Mongo` uses it, so
+# clients (and the IOLoops they hold) don't outlive their last user
+_CLIENT_CACHE: "weakref.WeakValueDictionary[Tuple[IOLoop, Tuple[Tuple[str, Any], ...]], MotorClient]" = (
+    weakref.WeakValueDictionary()
+)
+
+
+def _get_motor_client(**kwargs: Any) -> MotorClient:
+    """Get the shared MotorClient for `kwargs`, creating it if needed.
+
+    A MotorClient is bound to the IOLoop it was created on, so clients
+    are only shared within the current IOLoop.
+    """
+    io_loop = IOLoop.current()
+    key = (io_loop, tuple(sorted(kwargs.items())))
+    client = _CLIENT_CACHE.get(key)
+    if client is None:
+        client = _CLIENT_CACHE[key] = MotorClient(io_loop=io_loop, **kwargs)
+    return client
+
+
+def modification_date() -> str:
+    """Get the current time, formatted for `"meta_modify_date"`.
+
+    Same layout as `str(datetime.datetime.utcnow())`, but always with microseconds.
+    """
+    now = time.time()
+    t = time.gmtime(now)
+    return (
+        f"{t.tm_year:04}-{t.tm_mon:02}-{t.tm_mday:02} "
+        f"{t.tm_hour:02}:{t.tm_min:02}:{t.tm_sec:02}.{int(now % 1 * 1_000_000):06}"
+    )
+
 
 class AllKeys:  # pylint: disable=R0903
     """Include all keys in MongoDB find*() methods."""
 
 
+class PartialUpdateError(Exception):
+    """Some files of a bulk update were not found, the others were updated."""
+
+    def __init__(self, msg: str, missing: List[str]) -> None:
+        super().__init__(msg)
+        self.missing = missing
+
+
 class Mongo:
-    """A ThreadPoolExecutor-based MongoDB client."""
+    """An asyncio (Motor) MongoDB client."""
 
     def __init__(  # pylint: disable=R0913
         self,
@@ -33,95 +99,195 @@ class Mongo:
         username: Optional[str] = None,
         password: Optional[str] = None,
         uri: Optional[str] = None,
+        maxPoolSize: int = 100,
+        minPoolSize: int = 10,
+        waitQueueTimeoutMS: Optional[int] = None,
+        snapshot_cache_max_files: int = SNAPSHOT_CACHE_MAX_FILES,
     ) -> None:
+        # connection-pool tuning, applied to the shared client
+        pool_kwargs = {
+            "maxPoolSize": maxPoolSize,
+            "minPoolSize": minPoolSize,
+            "waitQueueTimeoutMS": waitQueueTimeoutMS,
+        }
 
         if uri:
             logger.info(f"MongoClient args: uri={uri}")
-            self.client = MotorClient(uri, authSource=authSource).file_catalog
+            self.client = _get_motor_client(
+                host=uri, authSource=authSource, **pool_kwargs
+            ).file_catalog
         else:
             logger.info(
                 "MongoClient args: host=%s, port=%s, username=%s", host, port, username
             )
-            self.client = MotorClient(
+            self.client = _get_motor_client(
                 host=host,
                 port=port,
                 authSource=authSource,
                 username=username,
                 password=password,
+                **pool_kwargs,
             ).file_catalog
 
-        asyncio.get_event_loop().run_until_complete(self.create_indexes())
-        self.executor = ThreadPoolExecutor(max_workers=10)
+        # snapshots are immutable, so they can be cached (LRU) once read;
+        # bounded by the total number of file uuids held, since that dominates their size
+        self._snapshot_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._snapshot_cache_files = 0
+        self._snapshot_cache_max_files = snapshot_cache_max_files
+
+    @classmethod
+    async def create(cls, *args: Any, **kwargs: Any) -> "Mongo":
+        """Construct a `Mongo` instance and await its `setup()`."""
+        mongo = cls(*args, **kwargs)
+        await mongo.setup()
+        return mongo
+
+    async def setup(self) -> None:
+        """Set up the database (indexes).
+
+        Await once, on the running event loop, before serving requests.
+        """
+        await self.drop_obsolete_indexes()
+        await self.create_indexes()
         logger.info("done setting up Mongo")
 
-    # fmt: off
+    @staticmethod
+    async def _drop_index(collection: Any, name: str) -> None:
+        """Drop an index by name, if it exists."""
+        try:
+            await collection.drop_index(name)
+        except pymongo.errors.OperationFailure as e:
+            if e.code != 27:  # IndexNotFound
+                raise
+        else:
+            logger.info("dropped obsolete index '%s' on '%s'", name, collection.name)
+
+    async def drop_obsolete_indexes(self) -> None:
+        """Drop indexes that earlier versions created, but are no longer used."""
+        await asyncio.gather(
+            # redundant with the unique `logical_name` index
+            self._drop_index(self.client.files, "logical_name_hashed"),
+            # replaced by the ascending (site, path) index
+            self._drop_index(
+                self.client.files, "locations.site_-1_locations.path_-1"
+            ),
+        )
+
+    @staticmethod
+    async def _create_index(collection: Any, keys: Any, **kwargs: Any) -> None:
+        """Create an index in the background, tolerating option changes.
+
+        If an index over the same keys already exists with different
+        options, it is left as-is; dropping and rebuilding it (an
+        index-less window on a large collection) is left to the operator.
+        """
+        try:
+            await collection.create_index(keys, background=True, **kwargs)
+        except pymongo.errors.OperationFailure as e:
+            if e.code != 85:  # IndexOptionsConflict
+                raise
+            logger.warning("index %r on '%s' was not updated: %s", keys, collection.name, e)
+
     async def create_indexes(self) -> None:
-        """Create indexes for all file-catalog mongo collections."""
-        # all files (a.k.a. required fields)
-        await self.client.files.create_index('uuid', unique=True, background=True)
-        await self.client.files.create_index('logical_name', unique=True, background=True)
-        await self.client.files.create_index([('logical_name', pymongo.HASHED)], background=True)
-        await self.client.files.create_index('locations', unique=True, background=True)
-        await self.client.files.create_index([('locations.site', pymongo.DESCENDING), ('locations.path', pymongo.DESCENDING)], background=True)
-        await self.client.files.create_index('create_date', background=True)
-
-        # all .i3 files
-        await self.client.files.create_index('content_status', sparse=True, background=True)
-        await self.client.files.create_index('processing_level', sparse=True, background=True)
-        await self.client.files.create_index('data_type', sparse=True, background=True)
-
-        # data_type=real files
-        await self.client.files.create_index('run.run_number', sparse=True, background=True)
-        await self.client.files.create_index('run.start_datetime', sparse=True, background=True)
-        await self.client.files.create_index('run.end_datetime', sparse=True, background=True)
-        await self.client.files.create_index('offline_processing_metadata.first_event', sparse=True, background=True)
-        await self.client.files.create_index('offline_processing_metadata.last_event', sparse=True, background=True)
-        await self.client.files.create_index('offline_processing_metadata.season', sparse=True, background=True)
-
-        # data_type=simulation files
-        await self.client.files.create_index('iceprod.dataset', sparse=True, background=True)
-
-        # # Collections
-        await self.client.collections.create_index('uuid', unique=True, background=True)
-        await self.client.collections.create_index('collection_name', background=True)
-        await self.client.collections.create_index('owner', background=True)
-
-        # # Snapshots
-        await self.client.snapshots.create_index('uuid', unique=True, background=True)
-        await self.client.snapshots.create_index('collection_id', background=True)
-        await self.client.snapshots.create_index('owner', background=True)
+        """Create indexes for all file-catalog mongo collections.
+
+        Each mongo collection's indexes are built concurrently with the
+        others', so the slow `files` builds overlap the fast ones.
+        """
+        await asyncio.gather(
+            self._create_files_indexes(),
+            self._create_collections_indexes(),
+            self._create_snapshots_indexes(),
+        )
+
+    # fmt: off
+    async def _create_files_indexes(self) -> None:
+        files = self.client.files
+        # dispatch all at once so the builds are pipelined, not awaited one by one
+        await asyncio.gather(
+            # all files (a.k.a. required fields)
+            self._create_index(files, 'uuid', unique=True),
+            self._create_index(files, 'logical_name', unique=True),
+            self._create_index(files, 'locations', unique=True),
+            # NOTE: (site, path) pairs may repeat across files (e.g. archive copies), so this is not unique
+            self._create_index(files, [('locations.site', pymongo.ASCENDING), ('locations.path', pymongo.ASCENDING)]),
+            self._create_index(files, 'create_date'),
+
+            # all .i3 files
+            self._create_index(files, 'content_status', sparse=True),
+            self._create_index(files, 'processing_level', sparse=True),
+            self._create_index(files, 'data_type', sparse=True),
+
+            # data_type=real files
+            self._create_index(files, 'run.run_number', sparse=True),
+            self._create_index(files, 'run.start_datetime', sparse=True),
+            self._create_index(files, 'run.end_datetime', sparse=True),
+            self._create_index(files, 'offline_processing_metadata.first_event', sparse=True),
+            self._create_index(files, 'offline_processing_metadata.last_event', sparse=True),
+            self._create_index(files, 'offline_processing_metadata.season', sparse=True),
+
+            # data_type=simulation files
+            self._create_index(files, 'iceprod.dataset', sparse=True),
+        )
+
+    async def _create_collections_indexes(self) -> None:
+        collections = self.client.collections
+        await asyncio.gather(
+            self._create_index(collections, 'uuid', unique=True),
+            self._create_index(collections, 'collection_name'),
+            self._create_index(collections, 'owner'),
+        )
+
+    async def _create_snapshots_indexes(self) -> None:
+        snapshots = self.client.snapshots
+        await asyncio.gather(
+            self._create_index(snapshots, 'uuid', unique=True),
+            self._create_index(snapshots, 'collection_id'),
+            self._create_index(snapshots, 'owner'),
+        )
     # fmt: on
 
     @staticmethod
     def _get_projection(
         keys: Optional[Union[List[str], AllKeys]] = None,
         default: Optional[Dict[str, bool]] = None,
-    ) -> Dict[str, bool]:
-        projection = {"_id": False}
-
+    ) -> Mapping[str, bool]:
+        """Get the (cached, read-only) MongoDB projection for `keys`."""
         if not keys:
-            if default:  # use default keys if they're available
-                projection.update(default)
+            # use default keys if they're available
+            fields = tuple(sorted(default.items())) if default else ()
         elif isinstance(keys, AllKeys):
-            pass  # only use "_id" constraint in projection
+            fields = ()  # only use "_id" constraint in projection
         elif isinstance(keys, list):
-            projection.update({k: True for k in keys})
+            fields = tuple((k, True) for k in sorted(keys))
         else:
             raise TypeError(
                 f"`keys` argument ({keys}) is not NoneType, list, or AllKeys"
             )
 
-        return projection
+        return _cached_projection(fields)
+
+    @staticmethod
+    def _limit_cursor(
+        cursor: MotorCursor, limit: Optional[int] = None, start: int = 0,
+    ) -> MotorCursor:
+        """Apply `limit` and `start` to `cursor`.
+
+        Both are pushed to the server, so only the requested window of
+        documents is returned. A `limit` of 0 means no limit. The batch
+        size follows `limit` (capped at `MAX_BATCH_SIZE`), so small pages
+        come back in a single round-trip.
+        """
+        batch_size = min(limit or MAX_BATCH_SIZE, MAX_BATCH_SIZE)
+        return cursor.skip(start).limit(limit or 0).batch_size(batch_size)
 
     @staticmethod
     async def _limit_result_list(
         cursor: MotorCursor, limit: Optional[int] = None, start: int = 0,
     ) -> List[Dict[str, Any]]:
         """Get sublist of results from `cursor` using `limit` and `start`."""
-        if limit:
-            results = await cursor.skip(start).limit(limit).to_list(None)
-        else:
-            results = await cursor.skip(start).to_list(None)
+        cursor = Mongo._limit_cursor(cursor, limit, start)
+        results = await cursor.to_list(length=limit or None)
         return cast(List[Dict[str, Any]], results)
 
     async def find_files(
@@ -135,9 +301,6 @@ class Mongo:
 
         Optionally, apply keyword arguments. "_id" is always excluded.
 
-        Decorators:
-            run_on_executor
-
         Keyword Arguments:
             query -- MongoDB query
             keys -- fields to include in MongoDB projection
@@ -147,42 +310,90 @@ class Mongo:
         Returns:
             List of MongoDB files
         """
-        projection = Mongo._get_projection(
-            keys, default={"uuid": True, "logical_name": True}
-        )
+        projection = Mongo._get_projection(keys, default=FILES_DEFAULT_KEYS)
         cursor = self.client.files.find(query, projection)
         results = await Mongo._limit_result_list(cursor, limit, start)
 
         return results
 
+    async def stream_files(
+        self,
+        query: Optional[Dict[str, Any]] = None,
+        keys: Optional[Union[List[str], AllKeys]] = None,
+        limit: Optional[int] = None,
+        start: int = 0,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Find files, yielding each one as it arrives from the cursor.
+
+        Same arguments as `find_files()`, but only one cursor batch is
+        buffered at a time, instead of the whole result list.
+        """
+        projection = Mongo._get_projection(keys, default=FILES_DEFAULT_KEYS)
+        cursor = self.client.files.find(query, projection)
+        async for file in Mongo._limit_cursor(cursor, limit, start):
+            yield file
+
+    async def find_file_uuids(self, query: Optional[Dict[str, Any]] = None) -> List[str]:
+        """Find the uuids of all files matching query.
+
+        Only the uuids are kept, instead of a dict per file. (`distinct()`
+        is avoided since its result is capped at the 16MB BSON limit.)
+        """
+        projection = Mongo._get_projection(["uuid"])
+        cursor = self.client.files.find(query, projection).batch_size(MAX_BATCH_SIZE)
+        return [file["uuid"] async for file in cursor]
+
     async def count_files(  # pylint: disable=W0613
         self, query: Optional[Dict[str, Any]] = None, **kwargs: Any,
     ) -> int:
-        """Get count of files matching query."""
-        if not query:
-            query = {}
+        """Get count of files matching query.
 
-        ret = await self.client.files.count_documents(query)
+        Without a query, the count comes from collection metadata instead
+        of a collection scan.
+        """
+        if not query:
+            ret = await self.client.files.estimated_document_count()
+        else:
+            ret = await self.client.files.count_documents(query)
 
         return cast(int, ret)
 
     async def create_file(self, metadata: types.Metadata) -> str:
         """Insert file metadata.
 
-        Return uuid.
+        Return uuid. Raise `pymongo.errors.DuplicateKeyError` if a
+        uniquely-indexed field (e.g. uuid) already exists.
         """
-        result = await self.client.files.insert_one(metadata)
+        await self.client.files.insert_one(metadata)
+        return metadata["uuid"]
 
-        if (not result) or (not result.inserted_id):
-            msg = "did not insert new file"
-            logger.warning(msg)
-            raise Exception(msg)
+    async def create_files(self, metadata_list: List[types.Metadata]) -> List[str]:
+        """Insert many files' metadata in a single round-trip.
 
-        return metadata["uuid"]
+        The insert is unordered, so one bad document does not block the
+        rest: on errors, the others are still inserted and a
+        `pymongo.errors.BulkWriteError` is raised afterwards, whose
+        `details["writeErrors"][i]["index"]` locate the failed documents
+        in `metadata_list`. Return uuids.
+        """
+        if not metadata_list:
+            return []
+
+        await self.client.files.insert_many(metadata_list, ordered=False)
+
+        return [metadata["uuid"] for metadata in metadata_list]
 
-    async def get_file(self, filters: Dict[str, Any]) -> types.Metadata:
-        """Get file matching filters."""
-        file = await self.client.files.find_one(filters, {"_id": False})
+    async def get_file(
+        self,
+        filters: Dict[str, Any],
+        keys: Optional[Union[List[str], AllKeys]] = None,
+    ) -> types.Metadata:
+        """Get file matching filters.
+
+        Optionally, only include `keys` fields. "_id" is always excluded.
+        """
+        projection = Mongo._get_projection(keys)  # show all fields by default
+        file = await self.client.files.find_one(filters, projection)
         return cast(types.Metadata, file)
 
     async def update_file(self, uuid: str, metadata: types.Metadata) -> None:
@@ -199,6 +410,28 @@ class Mongo:
             logger.warning(msg)
             raise Exception(msg)
 
+    async def update_files(self, updates: List[Tuple[str, types.Metadata]]) -> None:
+        """Update many files in a single round-trip.
+
+        `updates` is a list of `(uuid, metadata)` pairs, each applied with
+        `$set` like `update_file()`. The update is unordered and not
+        atomic: if some uuids are not found, the rest are still updated
+        and a `PartialUpdateError` listing the missing uuids is raised.
+        """
+        if not updates:
+            return
+
+        requests = [UpdateOne({"uuid": uuid}, {"$set": metadata}) for uuid, metadata in updates]
+        result = await self.client.files.bulk_write(requests, ordered=False)
+
+        if result.matched_count != len(updates):
+            uuids = [uuid for uuid, _ in updates]
+            found = set(await self.client.files.distinct("uuid", {"uuid": {"$in": uuids}}))
+            missing = [uuid for uuid in uuids if uuid not in found]
+            msg = f"matched {result.matched_count} of {len(updates)} files to update, missing: {missing}"
+            logger.warning(msg)
+            raise PartialUpdateError(msg, missing)
+
     async def replace_file(self, metadata: types.Metadata) -> None:
         """Replace file.
 
@@ -254,22 +487,43 @@ class Mongo:
     async def create_collection(self, metadata: Dict[str, Any]) -> str:
         """Create collection, insert metadata.
 
-        Return uuid.
+        Return uuid. Raise `pymongo.errors.DuplicateKeyError` if the uuid
+        already exists.
         """
-        result = await self.client.collections.insert_one(metadata)
-
-        if (not result) or (not result.inserted_id):
-            msg = "did not insert new collection"
-            logger.warning(msg)
-            raise Exception(msg)
-
+        await self.client.collections.insert_one(metadata)
         return cast(str, metadata["uuid"])
 
-    async def get_collection(self, filters: Dict[str, Any]) -> Dict[str, Any]:
-        """Get collection matching filters."""
-        collection = await self.client.collections.find_one(filters, {"_id": False})
+    async def get_collection(
+        self,
+        filters: Dict[str, Any],
+        keys: Optional[Union[List[str], AllKeys]] = None,
+    ) -> Dict[str, Any]:
+        """Get collection matching filters.
+
+        Optionally, only include `keys` fields. "_id" is always excluded.
+        """
+        projection = Mongo._get_projection(keys)  # show all fields by default
+        collection = await self.client.collections.find_one(filters, projection)
         return cast(Dict[str, Any], collection)
 
+    async def get_collection_by_uuid_or_name(self, uid: str) -> Optional[Dict[str, Any]]:
+        """Get the collection whose uuid, or else whose name, is `uid`.
+
+        Issued as a single query; a uuid match takes precedence over a
+        name match. Names are not unique, so all matches are read (no
+        limit), otherwise the uuid match could be cut off by name matches.
+        "_id" is always excluded.
+        """
+        projection = Mongo._get_projection()  # show all fields
+        cursor = self.client.collections.find(
+            {"$or": [{"uuid": uid}, {"collection_name": uid}]}, projection
+        )
+        collections = await cursor.to_list(length=None)
+        for collection in collections:
+            if collection["uuid"] == uid:
+                return cast(Dict[str, Any], collection)
+        return cast(Optional[Dict[str, Any]], collections[0] if collections else None)
+
     async def find_snapshots(
         self,
         query: Optional[Dict[str, Any]] = None,
@@ -299,45 +553,108 @@ class Mongo:
     async def create_snapshot(self, metadata: Dict[str, Any]) -> str:
         """Insert metadata into 'snapshots' collection.
 
-        Return uuid.
+        Return uuid. Raise `pymongo.errors.DuplicateKeyError` if the uuid
+        already exists.
         """
-        result = await self.client.snapshots.insert_one(metadata)
-
-        if (not result) or (not result.inserted_id):
-            msg = "did not insert new snapshot"
-            logger.warning(msg)
-            raise Exception(msg)
-
+        await self.client.snapshots.insert_one(metadata)
         return cast(str, metadata["uuid"])
 
-    async def get_snapshot(self, filters: Optional[Dict[str, Any]]) -> Dict[str, Any]:
-        """Find snapshot, optionally filtered."""
-        snapshot = await self.client.snapshots.find_one(filters, {"_id": False})
+    async def get_snapshot(
+        self,
+        filters: Optional[Dict[str, Any]],
+        keys: Optional[Union[List[str], AllKeys]] = None,
+    ) -> Dict[str, Any]:
+        """Find snapshot, optionally filtered.
+
+        Optionally, only include `keys` fields. "_id" is always excluded.
+        """
+        projection = Mongo._get_projection(keys)  # show all fields by default
+        snapshot = await self.client.snapshots.find_one(filters, projection)
         return cast(Dict[str, Any], snapshot)
 
+    async def get_snapshot_by_uuid(self, uuid: str) -> Optional[Dict[str, Any]]:
+        """Get snapshot by uuid, from the in-process cache if possible.
+
+        Snapshots are never modified after creation, so a cached snapshot
+        cannot go stale. Return a shallow copy, or `None` if not found.
+        """
+        try:
+            snapshot = self._snapshot_cache[uuid]
+            self._snapshot_cache.move_to_end(uuid)
+        except KeyError:
+            snapshot = await self.get_snapshot({"uuid": uuid})
+            if not snapshot:
+                return None
+            self._cache_snapshot(uuid, snapshot)
+        return dict(snapshot)
+
+    @staticmethod
+    def _snapshot_cache_cost(snapshot: Dict[str, Any]) -> int:
+        return len(snapshot.get("files", [])) + 1
+
+    def _cache_snapshot(self, uuid: str, snapshot: Dict[str, Any]) -> None:
+        """Add `snapshot` to the cache, evicting the least recently used.
+
+        Concurrent misses for the same uuid may both land here; the entry
+        cached first is kept, so its cost is only counted once.
+        """
+        if uuid in self._snapshot_cache:
+            self._snapshot_cache.move_to_end(uuid)
+            return
+        cost = Mongo._snapshot_cache_cost(snapshot)
+        if cost > self._snapshot_cache_max_files:
+            return  # too big to ever fit
+        self._snapshot_cache[uuid] = snapshot
+        self._snapshot_cache_files += cost
+        while self._snapshot_cache_files > self._snapshot_cache_max_files:
+            _, evicted = self._snapshot_cache.popitem(last=False)
+            self._snapshot_cache_files -= Mongo._snapshot_cache_cost(evicted)
+
+    @staticmethod
+    def _append_distinct_elements_update(metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the update appending distinct elements (set-semantics are applied server-side)."""
+        return {
+            "$addToSet": {
+                key: {"$each": val} if isinstance(val, list) else val
+                for key, val in metadata.items()
+            },
+            "$set": {
+                "meta_modify_date": modification_date()
+            },
+        }
+
     async def append_distinct_elements_to_file(
         self, uuid: str, metadata: Dict[str, Any]
     ) -> None:
         """Append distinct elements to arrays within a file document."""
-        # build the query to update the file document
-        update_query: Dict[str, Any] = {"$addToSet": {}}
-        for key in metadata:
-            if isinstance(metadata[key], list):
-                update_query["$addToSet"][key] = {"$each": metadata[key]}
-            else:
-                update_query["$addToSet"][key] = metadata[key]
-
-        # update the file document
-        update_query["$set"] = {"meta_modify_date": str(datetime.datetime.utcnow())}
-        result = await self.client.files.update_one({"uuid": uuid}, update_query)
-
-        # log and/or throw if the update results are surprising
-        if result.modified_count is None:
-            logger.warning(
-                "Cannot determine if document has been modified since `result.modified_count` has the value `None`. `result.matched_count` is %s",
-                result.matched_count,
-            )
-        elif result.modified_count != 1:
-            msg = f"updated {result.modified_count} files with id {uuid}"
+        result = await self.client.files.update_one(
+            {"uuid": uuid}, Mongo._append_distinct_elements_update(metadata)
+        )
+
+        # throw if the update results are surprising
+        if result.matched_count != 1:
+            msg = f"updated {result.matched_count} files with id {uuid}"
+            logger.warning(msg)
+            raise Exception(msg)
+
+    async def append_distinct_elements_and_get_file(
+        self, uuid: str, metadata: Dict[str, Any]
+    ) -> types.Metadata:
+        """Append distinct elements to arrays within a file document.
+
+        Return the updated file (fetched in the same round-trip).
+        """
+        file = await self.client.files.find_one_and_update(
+            {"uuid": uuid},
+            Mongo._append_distinct_elements_update(metadata),
+            projection={"_id": False},
+            return_document=ReturnDocument.AFTER,
+        )
+
+        # throw if the update results are surprising
+        if not file:
+            msg = f"updated 0 files with id {uuid}"
             logger.warning(msg)
             raise Exception(msg)
+
+        return cast(types.Metadata, file)
@@ -1,6 +1,6 @@
 """Utility functions for finding a given filepath in the FC."""
 
-import os
+import asyncio
 from typing import Any, Optional
 
 from .schema.types import Metadata
@@ -26,7 +26,7 @@ async def _contains_existing_logicalname(
     if "logical_name" in metadata:
         # try to load a file by that logical_name
         file_found = await apihandler.db.get_file(
-            {"logical_name": metadata["logical_name"]}
+            {"logical_name": metadata["logical_name"]}, keys=["uuid"]
         )
         # if we got a file by that logical_name
         if _is_conflict(uuid, file_found):
@@ -34,7 +34,7 @@ async def _contains_existing_logicalname(
             apihandler.send_error(
                 409,
                 reason=f"Conflict with existing file (logical_name already exists `{metadata['logical_name']}`)",
-                file=os.path.join(apihandler.files_url, file_found["uuid"]),
+                file=f"{apihandler.files_url}/{file_found['uuid']}",
             )
             return True
     return False
@@ -45,19 +45,22 @@ async def _contains_existing_locations(
 ) -> bool:
     # if the user provided locations
     if "locations" in metadata:
+        # try to load a file by each location provided (concurrently)
+        files_found = await asyncio.gather(
+            *[
+                apihandler.db.get_file({"locations": {"$elemMatch": loc}}, keys=["uuid"])
+                for loc in metadata["locations"]
+            ]
+        )
         # for each location provided
-        for loc in metadata["locations"]:
-            # try to load a file by that location
-            file_found = await apihandler.db.get_file(
-                {"locations": {"$elemMatch": loc}}
-            )
+        for loc, file_found in zip(metadata["locations"], files_found):
             # if we got a file by that location
             if _is_conflict(uuid, file_found):
                 # then that location belongs to another file (already exists)
                 apihandler.send_error(
                     409,
                     reason=f"Conflict with existing file (location already exists `{loc['path']}`)",
-                    file=os.path.join(apihandler.files_url, file_found["uuid"]),
+                    file=f"{apihandler.files_url}/{file_found['uuid']}",
                     location=loc,
                 )
                 return True
@@ -5,39 +5,44 @@
 
 from __future__ import absolute_import, division, print_function
 
-import copy
-import datetime
+import asyncio
+import collections
 import logging
 import os
-import random
+import secrets
 import sys
-from collections import OrderedDict
-from functools import wraps
+from functools import lru_cache, wraps
 from importlib.abc import Loader
 from pkgutil import get_loader
-from typing import Any, Callable, Dict, Optional, Union, cast
-from uuid import uuid1
+from typing import Any, AsyncIterator, Callable, Counter, Dict, List, Mapping, Optional, Union, cast
+from uuid import uuid4
 
+import orjson
 import pymongo.errors  # type: ignore[import]
 import tornado.ioloop
 import tornado.web
 from rest_tools.server import Auth  # type: ignore[import]
-from tornado.escape import json_decode, json_encode
+from tornado.http1connection import HTTP1Connection
 from tornado.httputil import url_concat
 
 # local imports
 import file_catalog
 
 from . import argbuilder, pathfinder, urlargparse
-from .mongo import Mongo
+from .mongo import SNAPSHOT_CACHE_MAX_FILES, Mongo, modification_date
 from .schema import types
 from .schema.validation import Validation
 
 logger = logging.getLogger('server')
 
 
+@lru_cache(maxsize=32)
 def get_pkgdata_filename(package: str, resource: str) -> Optional[str]:
-    """Get a filename for a resource bundled within the package."""
+    """Get a filename for a resource bundled within the package.
+
+    Results are cached, since resolving the package's loader & module is
+    repeated for every `Server` constructed.
+    """
     loader = cast(Optional[Loader], get_loader(package))
     if loader is None or not hasattr(loader, 'get_data'):
         return None
@@ -53,37 +58,62 @@ def get_pkgdata_filename(package: str, resource: str) -> Optional[str]:
     return os.path.join(*parts)
 
 
+# number of list items serialized (& flushed) at a time by `APIHandler.write_json_list()`
+JSON_LIST_CHUNK_SIZE = 256
+
+# log method per status code: debug < 400 <= warning < 500 <= error
+_LOG_METHODS = (logger.debug,) * 400 + (logger.warning,) * 100 + (logger.error,) * 100
+
+
 def tornado_logger(handler: Any) -> None:
     """Log levels based on status code."""
-    if handler.get_status() < 400:
-        log_method = logger.debug
-    elif handler.get_status() < 500:
-        log_method = logger.warning
-    else:
-        log_method = logger.error
+    status = handler.get_status()
+    log_method = _LOG_METHODS[status] if status < len(_LOG_METHODS) else logger.error
     request_time = 1000.0 * handler.request.request_time()
-    log_method("%d %s %.2fms", handler.get_status(),
+    log_method("%d %s %.2fms", status,
                handler._request_summary(), request_time)
 
 
-def sort_dict(dict_: Dict[str, Any]) -> 'OrderedDict[str, Any]':
-    """Create an OrderedDict by taking `dict` (`dict_`) and orders its keys.
+def prune_rate_limit_data(rate_limit_data: Counter[str]) -> None:
+    """Remove IPs without any in-flight requests."""
+    for ip in [ip for ip, count in rate_limit_data.items() if count <= 0]:
+        del rate_limit_data[ip]
+
+
+def _location_matches(loc: Mapping[str, Any], entry: Mapping[str, Any]) -> bool:
+    """Check if `entry` would match `{'$elemMatch': loc}`."""
+    return all(entry.get(key) == val for key, val in loc.items())
+
+
+def _location_key(loc: Mapping[str, Any]) -> bytes:
+    """Get a hashable key for `loc`, equal only for equal location entries.
 
-    If a key contains a `dict` it will call this function recursively.
+    Serialized (with sorted keys), so any JSON value (e.g. a list) works.
     """
-    odict = OrderedDict(sorted(dict_.items()))
+    return orjson.dumps(loc, option=orjson.OPT_SORT_KEYS)
 
-    # check for dicts in values
-    for key in odict:
-        if isinstance(odict[key], dict):
-            odict[key] = sort_dict(odict[key])
 
-    return odict
+@lru_cache(maxsize=1024)
+def _decoded_query(raw: str) -> Dict[str, Any]:
+    """Decode a collection's stored query string.
+
+    The result is shared between requests, so treat it as read-only.
+    """
+    return cast(Dict[str, Any], orjson.loads(raw))
+
+
+def _cancel(task: Optional['asyncio.Future[Any]']) -> None:
+    """Cancel a speculative task whose result is no longer wanted."""
+    if task is None:
+        return
+    task.cancel()
+    # if it already finished, mark any exception as retrieved (to not log it as "never retrieved")
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
 
 
 def set_last_modification_date(metadata: types.Metadata) -> None:
     """Set the `"meta_modify_date"` field."""
-    metadata['meta_modify_date'] = str(datetime.datetime.utcnow())
+    metadata['meta_modify_date'] = modification_date()
 
 
 # --------------------------------------------------------------------------------------
@@ -103,6 +133,9 @@ class Server:
         db_user: Optional[str] = None,
         db_pass: Optional[str] = None,
         db_uri: Optional[str] = None,
+        db_max_pool_size: int = 100,
+        db_min_pool_size: int = 10,
+        db_wait_queue_timeout_ms: Optional[int] = None,
     ) -> None:
         static_path = get_pkgdata_filename('file_catalog', 'data/www')
         if static_path is None:
@@ -115,36 +148,70 @@ class Server:
         logger.info('db port: %s', db_port)
         logger.info('db auth source: %s', db_auth_source)
         logger.info('db user: %s', db_user)
+        logger.info('db pool size: %s-%s (wait queue timeout: %sms)',
+                    db_min_pool_size, db_max_pool_size, db_wait_queue_timeout_ms)
         logger.info('server port: %r', port)
         logger.info('debug: %r', debug)
-        redacted_config = copy.deepcopy(config)
-        redacted_config['MONGODB_AUTH_PASS'] = 'REDACTED'
-        logger.info('redacted config: %r', redacted_config)
+        logger.info('redacted config: %r', {**config, 'MONGODB_AUTH_PASS': 'REDACTED'})
 
+        # token validation is identical for every request, so build it once
+        if 'TOKEN_KEY' in config:
+            auth = Auth(algorithm=config['TOKEN_ALGORITHM'],
+                        secret=config['TOKEN_KEY'],
+                        issuer=config['TOKEN_URL'])
+        else:
+            auth = None
+
+        base_url = '/api'
         main_args = {
-            'base_url': '/api',
+            'base_url': base_url,
             'debug': debug,
             'config': config,
+            'auth': auth,
         }
 
+        # one pooled client, shared by all handlers
+        self.db = Mongo(host=db_host, port=db_port, authSource=db_auth_source,
+                        username=db_user, password=db_pass, uri=db_uri,
+                        maxPoolSize=db_max_pool_size, minPoolSize=db_min_pool_size,
+                        waitQueueTimeoutMS=db_wait_queue_timeout_ms,
+                        snapshot_cache_max_files=config.get('FC_SNAPSHOT_CACHE_MAX_FILES',
+                                                            SNAPSHOT_CACHE_MAX_FILES))
+
+        # shared by all API handlers, so concurrent requests are counted together
+        rate_limit_data: Counter[str] = collections.Counter()
+        tornado.ioloop.PeriodicCallback(
+            lambda: prune_rate_limit_data(rate_limit_data), 60 * 1000
+        ).start()
+
         api_args = main_args.copy()
         api_args.update({
-            'db': Mongo(host=db_host, port=db_port, authSource=db_auth_source,
-                        username=db_user, password=db_pass, uri=db_uri),
+            'db': self.db,
             'config': config,
+            'rate_limit_data': rate_limit_data,
+            'validation': Validation(config),
+            # static url prefixes are known ahead of time, so pre-compute them
+            'files_url': f'{base_url}/files',
+            'collections_url': f'{base_url}/collections',
+            'snapshots_url': f'{base_url}/snapshots',
+            # ...along with their (never mutated) `_links` entries
+            'links': {
+                'base': {'href': base_url},
+                'files': {'href': f'{base_url}/files'},
+                'collections': {'href': f'{base_url}/collections'},
+            },
         })
 
         if config['FC_COOKIE_SECRET'] is not None:
             cookie_secret = config['FC_COOKIE_SECRET']
         else:
-            cookie_secret = ''.join(chr(random.randint(0, 128)) for _ in range(16))
+            cookie_secret = secrets.token_bytes(32)
 
-        app = tornado.web.Application(
+        self.port = port
+        self.app = tornado.web.Application(
             [
-                (r"/", MainHandler, main_args),
-                (r"/login", LoginHandler, main_args),
-                (r"/account", AccountHandler, main_args),
-                (r"/api", HATEOASHandler, api_args),
+                # API routes first, most-requested first (tornado tries each rule in order);
+                # literal routes must stay ahead of the patterns that would also match them
                 (r"/api/files", FilesHandler, api_args),
                 (r"/api/files/count", FilesCountHandler, api_args),
                 (r"/api/files/([^\/]+)", SingleFileHandler, api_args),
@@ -155,6 +222,11 @@ class Server:
                 (r"/api/collections/([^\/]+)/snapshots", SingleCollectionSnapshotsHandler, api_args),
                 (r"/api/snapshots/([^\/]+)", SingleSnapshotHandler, api_args),
                 (r"/api/snapshots/([^\/]+)/files", SingleSnapshotFilesHandler, api_args),
+                (r"/api", HATEOASHandler, api_args),
+                # web UI
+                (r"/", MainHandler, main_args),
+                (r"/login", LoginHandler, main_args),
+                (r"/account", AccountHandler, main_args),
             ],
             static_path=static_path,
             template_path=template_path,
@@ -164,11 +236,16 @@ class Server:
             cookie_secret=cookie_secret,
             debug=debug,
         )
-        app.listen(port)
 
-    def run(self) -> None:  # pylint: disable=R0201
-        """Start IO loop."""
-        tornado.ioloop.IOLoop.current().start()
+    def run(self) -> None:
+        """Set up the database, then listen & start IO loop.
+
+        No traffic is accepted until the indexes are set up.
+        """
+        ioloop = tornado.ioloop.IOLoop.current()
+        ioloop.run_sync(self.db.setup)
+        self.app.listen(self.port)
+        ioloop.start()
 
 
 # --------------------------------------------------------------------------------------
@@ -182,17 +259,13 @@ class MainHandler(tornado.web.RequestHandler):
         config: Dict[str, Any],
         base_url: str = "/",
         debug: bool = False,
+        auth: Optional[Auth] = None,
     ) -> None:  # noqa: D102
         self.base_url = base_url
         self.debug = debug
         self.config = config
-        if 'TOKEN_KEY' in self.config:
-            self.auth = Auth(algorithm=self.config['TOKEN_ALGORITHM'],
-                             secret=self.config['TOKEN_KEY'],
-                             issuer=self.config['TOKEN_URL'])
-            self.auth_key: Optional[bytes] = None
-        else:
-            self.auth = None
+        self.auth = auth
+        self.auth_key: Optional[bytes] = None
         self.current_user_secure = None
         self.address = config['FC_PUBLIC_URL']
 
@@ -204,6 +277,8 @@ class MainHandler(tornado.web.RequestHandler):
 
     def get_current_user(self) -> Optional[str]:
         """Get the current user by parsing the token."""
+        if self.auth is None:  # no token validation configured
+            return None
         try:
             token = self.get_secure_cookie('token')
             logger.info('token: %r', token)
@@ -311,12 +386,12 @@ def validate_auth(method: Callable[..., Any]) -> Callable[..., Any]:
         if not self.auth:  # skip auth if not present
             return method(self, *args, **kwargs)
         try:
-            auth_key = self.request.headers['Authorization'].split(' ', 1)
-            if not auth_key[0].lower() == 'bearer':
+            scheme, _, token = self.request.headers['Authorization'].partition(' ')
+            if scheme.lower() != 'bearer':
                 raise Exception('not a bearer token')
-            # logger.info('validate_auth token: %r', auth_key[1])
-            self.auth.validate(auth_key[1], audience=['ANY'])
-            self.auth_key = auth_key[1]
+            # logger.info('validate_auth token: %r', token)
+            self.auth.validate(token, audience=['ANY'])
+            self.auth_key = token
         except Exception as e:  # pylint: disable=W0703
             logger.warning('auth error', exc_info=True)
             kwargs = {'message': 'Authorization error', 'status_code': 403}
@@ -339,6 +414,13 @@ class APIHandler(tornado.web.RequestHandler):
         base_url: str = "/",
         debug: bool = False,
         rate_limit: int = 10,
+        rate_limit_data: Optional[Counter[str]] = None,
+        auth: Optional[Auth] = None,
+        files_url: Optional[str] = None,
+        collections_url: Optional[str] = None,
+        snapshots_url: Optional[str] = None,
+        validation: Optional[Validation] = None,
+        links: Optional[Dict[str, Dict[str, str]]] = None,
     ) -> None:
         """Initialize handler."""
         if db is None:
@@ -346,19 +428,27 @@ class APIHandler(tornado.web.RequestHandler):
 
         self.db = db
         self.base_url = base_url
+        self.files_url = files_url or f"{base_url.rstrip('/')}/files"
+        self.collections_url = collections_url or f"{base_url.rstrip('/')}/collections"
+        self.snapshots_url = snapshots_url or f"{base_url.rstrip('/')}/snapshots"
+        # shared `_links` entries for the static urls (treat as read-only)
+        self.links = links or {
+            'base': {'href': self.base_url},
+            'files': {'href': self.files_url},
+            'collections': {'href': self.collections_url},
+        }
         self.debug = debug
         self.config = config
-        if 'TOKEN_KEY' in self.config:
-            self.auth = Auth(algorithm=self.config['TOKEN_ALGORITHM'],
-                             secret=self.config['TOKEN_KEY'],
-                             issuer=self.config['TOKEN_URL'])
-            self.auth_key = None
-        else:
-            self.auth = None
+        self.validation = validation or Validation(config)
+        self.auth = auth
+        self.auth_key = None
 
         # subtract 1 to test before current connection is added
         self.rate_limit = rate_limit - 1
-        self.rate_limit_data: Dict[str, int] = {}
+        if rate_limit_data is None:
+            rate_limit_data = collections.Counter()
+        self.rate_limit_data = rate_limit_data
+        self.rate_limit_counted = False
 
     def check_xsrf_cookie(self) -> None:  # noqa: D102
         pass
@@ -367,43 +457,101 @@ class APIHandler(tornado.web.RequestHandler):
         self.set_header('Content-Type', 'application/hal+json; charset=UTF-8')
 
     def prepare(self) -> None:  # noqa: D102
-        # implement rate limiting
+        # implement rate limiting (a Counter defaults missing IPs to 0)
         ip = self.request.remote_ip
-        if ip in self.rate_limit_data:
-            if self.rate_limit_data[ip] > self.rate_limit:
-                self.send_error(429, reason='Rate limit exceeded for IP address')
-            else:
-                self.rate_limit_data[ip] += 1
+        if self.rate_limit_data[ip] > self.rate_limit:
+            self.send_error(429, reason='Rate limit exceeded for IP address')
         else:
-            self.rate_limit_data[ip] = 1
+            self.rate_limit_data[ip] += 1
+            self.rate_limit_counted = True
 
     def on_finish(self) -> None:  # noqa: D102
-        ip = self.request.remote_ip
-        self.rate_limit_data[ip] -= 1
-        if self.rate_limit_data[ip] <= 0:
-            del self.rate_limit_data[ip]
-
-    def write(self, chunk: Union[str, bytes, Dict[str, Any], types.Metadata]) -> None:
-        """Write chunk to output buffer."""
-        # override write so we don't output a json header
-        if isinstance(chunk, dict):
-            chunk = cast(Dict[str, Any], chunk)  # unfortunately necessary, but a no-op
-            chunk = sort_dict(chunk)
-            chunk = json_encode(chunk)
-        super().write(chunk)
+        # zero entries are tolerated (see `prune_rate_limit_data()`), instead of deleting per request
+        if self.rate_limit_counted:
+            self.rate_limit_data[self.request.remote_ip] -= 1
+
+    def write_json(self, obj: Union[Dict[str, Any], types.Metadata]) -> None:
+        """Serialize `obj` as JSON & write it to the output buffer.
+
+        Unlike `write()` with a dict, this keeps the hal+json content-type.
+        """
+        # sort keys (recursively) & serialize in a single pass
+        self.write(orjson.dumps(obj, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS))
+
+    async def write_json_list(self, links: Dict[str, Any], key: str, items: AsyncIterator[Dict[str, Any]]) -> None:
+        """Serialize `{'_links': links, key: [...items]}` & write it, in chunks.
+
+        `items` is consumed & serialized `JSON_LIST_CHUNK_SIZE` at a time,
+        and flushed between chunks, so a long list is never held in memory
+        nor buffered as one body (short lists go out in one write, like
+        `write_json()`). `key` must sort after `'_links'`, to match
+        `write_json()`'s key order.
+
+        If `items` raises before anything is flushed, the exception
+        propagates and an error response is sent as usual. Once a chunk
+        has been flushed, the 200 status line is already sent, so the
+        connection is closed without the terminating chunk instead; the
+        client then sees a failed (incomplete) response, not a truncated
+        list that looks complete.
+        """
+        option = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+        self.write(b'{"_links":' + orjson.dumps(links, option=option) + b',' + orjson.dumps(key) + b':[')
+
+        chunks_written = 0
+
+        async def write_chunk(batch: List[Dict[str, Any]]) -> None:
+            nonlocal chunks_written
+            if chunks_written:
+                await self.flush()
+                self.write(b',')
+            # strip the brackets, so the chunks join into one array
+            self.write(orjson.dumps(batch, option=option)[1:-1])
+            chunks_written += 1
+
+        chunk: List[Dict[str, Any]] = []
+        try:
+            async for item in items:
+                chunk.append(item)
+                if len(chunk) == JSON_LIST_CHUNK_SIZE:
+                    await write_chunk(chunk)
+                    chunk = []
+        except Exception:
+            if chunks_written <= 1:  # nothing flushed yet
+                raise
+            logger.warning('Error after partial response, closing connection', exc_info=True)
+            cast(HTTP1Connection, self.request.connection).close()
+            raise tornado.web.Finish()  # pylint: disable=W0707
+        if chunk:
+            await write_chunk(chunk)
+
+        self.write(b']}')
 
     def write_error(self, status_code: int, **kwargs: Any) -> None:
         """Write out custom error page."""
         logger.debug(f"{status_code}-ERROR: kwargs={kwargs}")
         kwargs.pop('exc_info', None)
         if kwargs:
-            self.write(kwargs)
+            self.write_json(kwargs)
         self.finish()
 
 
 # --------------------------------------------------------------------------------------
 
 
+@lru_cache(maxsize=32)
+def _hateoas_blob(base_url: str, files_url: str) -> bytes:
+    """Serialize the (constant) HATEOAS root response."""
+    return orjson.dumps(
+        {
+            '_links': {
+                'self': {'href': base_url},
+            },
+            'files': {'href': files_url},
+        },
+        option=orjson.OPT_SORT_KEYS,
+    )
+
+
 class HATEOASHandler(APIHandler):
     """Initialize a new handler."""
 
@@ -411,14 +559,9 @@ class HATEOASHandler(APIHandler):
         """Initialize handler."""
         super().initialize(**kwargs)
 
-        # response is known ahead of time, so pre-compute it
+        # response is known ahead of time, so pre-compute it (serialized once per url pair)
         # pylint: disable=W0201
-        self.data = {
-            '_links': {
-                'self': {'href': self.base_url},
-            },
-            'files': {'href': os.path.join(self.base_url, 'files')},
-        }
+        self.data = _hateoas_blob(self.base_url, self.files_url)
 
     @catch_error
     def get(self) -> None:
@@ -432,13 +575,6 @@ class HATEOASHandler(APIHandler):
 class FilesHandler(APIHandler):
     """Initialize a handler for requesting files without a known uuid."""
 
-    def initialize(self, **kwargs: Any) -> None:  # type: ignore[override]  # pylint: disable=C0116,W0221
-        """Initialize handler."""
-        super().initialize(**kwargs)
-        # pylint: disable=W0201
-        self.files_url = os.path.join(self.base_url, 'files')
-        self.validation = Validation(self.config)  # pylint: disable=W0201
-
     @validate_auth
     @catch_error
     async def get(self) -> None:
@@ -449,17 +585,17 @@ class FilesHandler(APIHandler):
             argbuilder.build_start(kwargs)
             argbuilder.build_files_query(kwargs)
             argbuilder.build_keys(kwargs)
-        except Exception:  # pylint: disable=W0703
+        except argbuilder.ARG_ERRORS:
             logging.warning('query parameter error', exc_info=True)
             self.send_error(400, reason='Invalid query parameter(s)')
             return
 
         files = await self.db.find_files(**kwargs)
 
-        self.write({
+        self.write_json({
             '_links': {
-                'self': {'href': self.files_url},
-                'parent': {'href': self.base_url},
+                'self': self.links['files'],
+                'parent': self.links['base'],
             },
             'files': files,
         })
@@ -468,11 +604,11 @@ class FilesHandler(APIHandler):
     @catch_error
     async def post(self) -> None:
         """Handle POST request."""
-        metadata: types.Metadata = json_decode(self.request.body)
+        metadata: types.Metadata = orjson.loads(self.request.body)
 
         # allow user-specified uuid, create if not found
         if 'uuid' not in metadata:
-            metadata['uuid'] = str(uuid1())
+            metadata['uuid'] = str(uuid4())
 
         if not self.validation.validate_metadata_creation(self, metadata):
             return
@@ -481,36 +617,40 @@ class FilesHandler(APIHandler):
         if await pathfinder.contains_existing_filepaths(self, metadata):
             return
 
-        db_file = await self.db.get_file({'uuid': metadata['uuid']})
+        db_file = await self.db.get_file({'uuid': metadata['uuid']}, keys=['uuid', 'checksum', 'locations'])
 
         if db_file:
             # file uuid already exists, check checksum
             if db_file['checksum'] != metadata['checksum']:
                 # the uuid already exists (no replica since checksum is different
                 self.send_error(409, reason='Conflict with existing file (uuid already exists)',
-                                file=os.path.join(self.files_url, db_file['uuid']))
+                                file=f"{self.files_url}/{db_file['uuid']}")
                 return
-            elif any(f in db_file['locations'] for f in metadata['locations']):
+            elif not {_location_key(loc) for loc in db_file['locations']}.isdisjoint(
+                    _location_key(loc) for loc in metadata['locations']):
                 # replica has already been added
                 self.send_error(409, reason='Replica has already been added',
-                                file=os.path.join(self.files_url, db_file['uuid']))
+                                file=f"{self.files_url}/{db_file['uuid']}")
                 return
             else:
-                # add replica
-                db_file['locations'].extend(metadata['locations'])
-
-                await self.db.update_file(db_file['uuid'], {'locations': db_file['locations']})
+                # add replica (appended server-side, instead of re-sending the whole array)
+                await self.db.append_distinct_elements_to_file(db_file['uuid'], {'locations': metadata['locations']})
                 self.set_status(200)
                 uuid = db_file['uuid']
         else:
-            uuid = await self.db.create_file(metadata)
+            try:
+                uuid = await self.db.create_file(metadata)
+            except pymongo.errors.DuplicateKeyError:
+                # lost a race with a concurrent request
+                self.send_error(409, reason='Conflict with existing file (uuid, logical_name, or location already exists)')
+                return
             self.set_status(201)
-        self.write({
+        self.write_json({
             '_links': {
-                'self': {'href': self.files_url},
-                'parent': {'href': self.base_url},
+                'self': self.links['files'],
+                'parent': self.links['base'],
             },
-            'file': os.path.join(self.files_url, uuid),
+            'file': f"{self.files_url}/{uuid}",
         })
 
 
@@ -520,13 +660,6 @@ class FilesHandler(APIHandler):
 class FilesCountHandler(APIHandler):
     """Initialize a handler for counting files."""
 
-    def initialize(self, **kwargs: Any) -> None:  # type: ignore[override]  # pylint: disable=C0116,W0221
-        """Initialize handler."""
-        super().initialize(**kwargs)
-        # pylint: disable=W0201
-        self.files_url = os.path.join(self.base_url, 'files')
-        self.validation = Validation(self.config)
-
     @validate_auth
     @catch_error
     async def get(self) -> None:
@@ -534,17 +667,17 @@ class FilesCountHandler(APIHandler):
         try:
             kwargs = urlargparse.parse(self.request.query)
             argbuilder.build_files_query(kwargs)
-        except Exception:  # pylint: disable=W0703
+        except argbuilder.ARG_ERRORS:
             logging.warning('query parameter error', exc_info=True)
             self.send_error(400, reason='Invalid query parameter(s)')
             return
 
         files = await self.db.count_files(**kwargs)
 
-        self.write({
+        self.write_json({
             '_links': {
-                'self': {'href': self.files_url},
-                'parent': {'href': self.base_url},
+                'self': self.links['files'],
+                'parent': self.links['base'],
             },
             'files': files,
         })
@@ -556,13 +689,6 @@ class FilesCountHandler(APIHandler):
 class SingleFileHandler(APIHandler):
     """Initialize a handler for requesting single files via uuid."""
 
-    def initialize(self, **kwargs: Any) -> None:  # type: ignore[override]  # pylint: disable=C0116,W0221
-        """Initialize handler."""
-        super().initialize(**kwargs)
-        # pylint: disable=W0201
-        self.files_url = os.path.join(self.base_url, 'files')
-        self.validation = Validation(self.config)
-
     @validate_auth
     @catch_error
     async def get(self, uuid: str) -> None:
@@ -572,11 +698,11 @@ class SingleFileHandler(APIHandler):
 
             if db_file:
                 db_file['_links'] = {
-                    'self': {'href': os.path.join(self.files_url, uuid)},
-                    'parent': {'href': self.files_url},
+                    'self': {'href': f"{self.files_url}/{uuid}"},
+                    'parent': self.links['files'],
                 }
 
-                self.write(db_file)
+                self.write_json(db_file)
             else:
                 self.send_error(404, reason='File uuid not found')
         except pymongo.errors.InvalidId:
@@ -599,7 +725,7 @@ class SingleFileHandler(APIHandler):
     @catch_error
     async def patch(self, uuid: str) -> None:
         """Handle PATCH request."""
-        metadata: types.Metadata = json_decode(self.request.body)
+        metadata: types.Metadata = orjson.loads(self.request.body)
 
         # Find Matching File
         try:
@@ -627,16 +753,16 @@ class SingleFileHandler(APIHandler):
         # Insert into DB & Write Back
         await self.db.update_file(uuid, metadata)
         db_file['_links'] = {
-            'self': {'href': os.path.join(self.files_url, uuid)},
-            'parent': {'href': self.files_url},
+            'self': {'href': f"{self.files_url}/{uuid}"},
+            'parent': self.links['files'],
         }
-        self.write(db_file)
+        self.write_json(db_file)
 
     @validate_auth
     @catch_error
     async def put(self, uuid: str) -> None:
         """Handle PUT request."""
-        metadata: types.Metadata = json_decode(self.request.body)
+        metadata: types.Metadata = orjson.loads(self.request.body)
 
         # Find Matching File
         try:
@@ -660,13 +786,13 @@ class SingleFileHandler(APIHandler):
         if not self.validation.validate_metadata_modification(self, metadata):
             return
 
-        # Insert into DB & Write Back
-        await self.db.replace_file(metadata.copy())
+        # Insert into DB & Write Back (`replace_one()` doesn't modify `metadata`, so no copy is needed)
+        await self.db.replace_file(metadata)
         metadata['_links'] = {
-            'self': {'href': os.path.join(self.files_url, uuid)},
-            'parent': {'href': self.files_url},
+            'self': {'href': f"{self.files_url}/{uuid}"},
+            'parent': self.links['files'],
         }
-        self.write(metadata)
+        self.write_json(metadata)
 
 
 # --------------------------------------------------------------------------------------
@@ -675,12 +801,6 @@ class SingleFileHandler(APIHandler):
 class SingleFileLocationsHandler(APIHandler):
     """Initialize a handler for adding new locations to an existing record."""
 
-    def initialize(self, **kwargs: Any) -> None:  # type: ignore[override]  # pylint: disable=C0116,W0221
-        """Initialize handler."""
-        super().initialize(**kwargs)
-        # pylint: disable=W0201
-        self.files_url = os.path.join(self.base_url, 'files')
-
     @validate_auth
     @catch_error
     async def post(self, uuid: str) -> None:
@@ -701,7 +821,7 @@ class SingleFileLocationsHandler(APIHandler):
             return
 
         # decode the JSON provided in the POST body
-        metadata: types.Metadata = json_decode(self.request.body)
+        metadata: types.Metadata = orjson.loads(self.request.body)
         locations = metadata.get("locations")
 
         # if the user didn't provide locations
@@ -714,41 +834,48 @@ class SingleFileLocationsHandler(APIHandler):
             self.send_error(400, reason=f"Field 'locations' must be a list (not `{type(locations)}`)")
             return
 
-        # for each location provided
-        new_locations = []
-        for loc in locations:
-            # try to load a file by that location
-            check = await self.db.get_file({'locations': {'$elemMatch': loc}})
-            # if we got a file by that location
-            if check:
-                # if the file we got isn't the one we're trying to update
-                if check['uuid'] != uuid:
-                    # then that location belongs to another file (already exists)
-                    self.send_error(409, reason=f"Conflict with existing file (location already exists `{loc['path']}`)",
-                                    file=os.path.join(self.files_url, check['uuid']),
-                                    location=loc)
-                    return
-                # note that if we get the record that we are trying to update
-                # the location will NOT be added to the list of new_locations
-                # which leaves new_locations as a vetted list of addable locations
-            # this is a new location
-            else:
-                # so add it to our list of new locations
-                new_locations.append(loc)
+        # find any *other* files with any of these locations, all in one query
+        if locations:
+            conflicts = await self.db.find_files(
+                query={
+                    'uuid': {'$ne': uuid},
+                    '$or': [{'locations': {'$elemMatch': loc}} for loc in locations],
+                },
+                keys=['uuid', 'locations'],
+            )
+        else:
+            conflicts = []
+
+        # if a location belongs to another file (already exists)
+        if conflicts:
+            loc, check = next(
+                ((loc, check) for loc in locations for check in conflicts
+                 if any(_location_matches(loc, entry) for entry in check['locations'])),
+                (locations[0], conflicts[0]),  # the db matched something not mirrored by `_location_matches()`
+            )
+            self.send_error(409, reason=f"Conflict with existing file (location already exists `{loc['path']}`)",
+                            file=f"{self.files_url}/{check['uuid']}",
+                            location=loc)
+            return
+
+        # locations already in the record we are trying to update are NOT added,
+        # which leaves new_locations as a vetted list of addable locations
+        new_locations = [
+            loc for loc in locations
+            if not any(_location_matches(loc, entry) for entry in db_file.get('locations', []))
+        ]
 
         # if there are new locations to append
         if new_locations:
-            # update the file in the database
-            await self.db.append_distinct_elements_to_file(uuid, {'locations': new_locations})
-            # re-read the updated file from the database
-            db_file = await self.db.get_file({'uuid': uuid})
+            # update the file in the database, getting back the updated file
+            db_file = await self.db.append_distinct_elements_and_get_file(uuid, {'locations': new_locations})
 
         # send the record back to the caller
         db_file['_links'] = {
-            'self': {'href': os.path.join(self.files_url, uuid)},
-            'parent': {'href': self.files_url},
+            'self': {'href': f"{self.files_url}/{uuid}"},
+            'parent': self.links['files'],
         }
-        self.write(db_file)
+        self.write_json(db_file)
 
 
 # Collections #
@@ -758,12 +885,9 @@ class SingleFileLocationsHandler(APIHandler):
 class CollectionBaseHandler(APIHandler):
     """Initialize an abstract/base handler for collection-type requests."""
 
-    def initialize(self, **kwargs: Any) -> None:  # type: ignore[override]  # pylint: disable=C0116,W0221
-        """Initialize handler."""
-        super().initialize(**kwargs)
-        # pylint: disable=W0201
-        self.collections_url = os.path.join(self.base_url, 'collections')
-        self.snapshots_url = os.path.join(self.base_url, 'snapshots')
+    async def get_collection_by_id(self, uid: str) -> Optional[Dict[str, Any]]:
+        """Get the collection whose uuid (or else name) is `uid`, in one query."""
+        return await self.db.get_collection_by_uuid_or_name(uid)
 
 
 # --------------------------------------------------------------------------------------
@@ -781,17 +905,17 @@ class CollectionsHandler(CollectionBaseHandler):
             argbuilder.build_limit(kwargs, self.config)
             argbuilder.build_start(kwargs)
             argbuilder.build_keys(kwargs)
-        except Exception:  # pylint: disable=W0703
+        except argbuilder.ARG_ERRORS:
             logging.warning('query parameter error', exc_info=True)
             self.send_error(400, reason='Invalid query parameter(s)')
             return
 
         collections = await self.db.find_collections(**kwargs)
 
-        self.write({
+        self.write_json({
             '_links': {
-                'self': {'href': self.collections_url},
-                'parent': {'href': self.base_url},
+                'self': self.links['collections'],
+                'parent': self.links['base'],
             },
             'collections': collections,
         })
@@ -800,12 +924,12 @@ class CollectionsHandler(CollectionBaseHandler):
     @catch_error
     async def post(self) -> None:
         """Handle POST request."""
-        metadata = json_decode(self.request.body)
+        metadata = orjson.loads(self.request.body)
 
         try:
             argbuilder.build_files_query(metadata)
-            metadata['query'] = json_encode(metadata['query'])
-        except Exception:  # pylint: disable=W0703
+            metadata['query'] = orjson.dumps(metadata['query']).decode()
+        except argbuilder.ARG_ERRORS:
             logging.warning('query parameter error', exc_info=True)
             self.send_error(400, reason='Invalid query parameter(s)')
             return
@@ -819,27 +943,32 @@ class CollectionsHandler(CollectionBaseHandler):
 
         # allow user-specified uuid, create if not found
         if 'uuid' not in metadata:
-            metadata['uuid'] = str(uuid1())
+            metadata['uuid'] = str(uuid4())
 
         set_last_modification_date(metadata)
         metadata['creation_date'] = metadata['meta_modify_date']
 
-        ret = await self.db.get_collection({'uuid': metadata['uuid']})
+        ret = await self.db.get_collection({'uuid': metadata['uuid']}, keys=['uuid'])
 
         if ret:
             # collection uuid already exists
             self.send_error(409, reason='Conflict with existing collection (uuid already exists)',
-                            file=os.path.join(self.collections_url, ret['uuid']))
+                            file=f"{self.collections_url}/{ret['uuid']}")
             return
         else:
-            uuid = await self.db.create_collection(metadata)
+            try:
+                uuid = await self.db.create_collection(metadata)
+            except pymongo.errors.DuplicateKeyError:
+                # lost a race with a concurrent request
+                self.send_error(409, reason='Conflict with existing collection (uuid already exists)')
+                return
             self.set_status(201)
-        self.write({
+        self.write_json({
             '_links': {
-                'self': {'href': self.collections_url},
-                'parent': {'href': self.base_url},
+                'self': self.links['collections'],
+                'parent': self.links['base'],
             },
-            'collection': os.path.join(self.collections_url, uuid),
+            'collection': f"{self.collections_url}/{uuid}",
         })
 
 
@@ -853,17 +982,15 @@ class SingleCollectionHandler(CollectionBaseHandler):
     @catch_error
     async def get(self, uid: str) -> None:
         """Handle GET request."""
-        ret = await self.db.get_collection({'uuid': uid})
-        if not ret:
-            ret = await self.db.get_collection({'collection_name': uid})
+        ret = await self.get_collection_by_id(uid)
 
         if ret:
             ret['_links'] = {
-                'self': {'href': os.path.join(self.collections_url, uid)},
-                'parent': {'href': self.collections_url},
+                'self': {'href': f"{self.collections_url}/{uid}"},
+                'parent': self.links['collections'],
             }
 
-            self.write(ret)
+            self.write_json(ret)
         else:
             self.send_error(404, reason='Collection not found')
 
@@ -878,31 +1005,27 @@ class SingleCollectionFilesHandler(CollectionBaseHandler):
     @catch_error
     async def get(self, uid: str) -> None:
         """Handle GET request."""
-        ret = await self.db.get_collection({'uuid': uid})
-        if not ret:
-            ret = await self.db.get_collection({'collection_name': uid})
+        ret = await self.get_collection_by_id(uid)
 
         if ret:
             try:
                 kwargs = urlargparse.parse(self.request.query)
                 argbuilder.build_limit(kwargs, self.config)
                 argbuilder.build_start(kwargs)
-                kwargs['query'] = json_decode(ret['query'])
+                kwargs['query'] = _decoded_query(ret['query'])
                 argbuilder.build_keys(kwargs)
-            except Exception:  # pylint: disable=W0703
+            except argbuilder.ARG_ERRORS:
                 logging.warning('query parameter error', exc_info=True)
                 self.send_error(400, reason='Invalid query parameter(s)')
                 return
 
-            files = await self.db.find_files(**kwargs)
-
-            self.write({
-                '_links': {
-                    'self': {'href': os.path.join(self.collections_url, uid, 'files')},
-                    'parent': {'href': os.path.join(self.collections_url, uid)},
+            await self.write_json_list(
+                {
+                    'self': {'href': f"{self.collections_url}/{uid}/files"},
+                    'parent': {'href': f"{self.collections_url}/{uid}"},
                 },
-                'files': files,
-            })
+                'files', self.db.stream_files(**kwargs),
+            )
         else:
             self.send_error(404, reason='Collection not found')
 
@@ -917,30 +1040,47 @@ class SingleCollectionSnapshotsHandler(CollectionBaseHandler):
     @catch_error
     async def get(self, uid: str) -> None:
         """Handle GET request."""
-        ret = await self.db.get_collection({'uuid': uid})
-        if not ret:
-            ret = await self.db.get_collection({'collection_name': uid})
-        if not ret:
-            self.send_error(400, reason='Cannot find collection')
-            return
-
+        # parse the args up front, so the snapshots can be fetched alongside the collection
+        kwargs: Optional[Dict[str, Any]]
         try:
             kwargs = urlargparse.parse(self.request.query)
             argbuilder.build_limit(kwargs, self.config)
             argbuilder.build_start(kwargs)
             argbuilder.build_keys(kwargs)
-            kwargs['query'] = {'collection_id': ret['uuid']}
-        except Exception:  # pylint: disable=W0703
+            kwargs['query'] = {'collection_id': uid}
+        except argbuilder.ARG_ERRORS:
             logging.warning('query parameter error', exc_info=True)
-            self.send_error(400, reason='Invalid query parameter(s)')
+            kwargs = None
+
+        # speculatively assume `uid` is the collection's uuid (not its name)
+        snapshots_task: Optional['asyncio.Future[List[Dict[str, Any]]]'] = None
+        if kwargs is not None:
+            snapshots_task = asyncio.ensure_future(self.db.find_snapshots(**kwargs))
+
+        try:
+            ret = await self.get_collection_by_id(uid)
+        except BaseException:  # including CancelledError, e.g. client disconnect
+            _cancel(snapshots_task)
+            raise
+        if not ret or kwargs is None:
+            _cancel(snapshots_task)
+            if not ret:
+                self.send_error(400, reason='Cannot find collection')
+            else:
+                self.send_error(400, reason='Invalid query parameter(s)')
             return
 
-        snapshots = await self.db.find_snapshots(**kwargs)
+        if ret['uuid'] == uid and snapshots_task:
+            snapshots = await snapshots_task
+        else:  # `uid` was the collection's name
+            _cancel(snapshots_task)
+            kwargs['query'] = {'collection_id': ret['uuid']}
+            snapshots = await self.db.find_snapshots(**kwargs)
 
-        self.write({
+        self.write_json({
             '_links': {
-                'self': {'href': os.path.join(self.collections_url, uid, 'snapshots')},
-                'parent': {'href': os.path.join(self.collections_url, uid)},
+                'self': {'href': f"{self.collections_url}/{uid}/snapshots"},
+                'parent': {'href': f"{self.collections_url}/{uid}"},
             },
             'snapshots': snapshots,
         })
@@ -949,20 +1089,13 @@ class SingleCollectionSnapshotsHandler(CollectionBaseHandler):
     @catch_error
     async def post(self, uid: str) -> None:
         """Handle POST request."""
-        ret = await self.db.get_collection({'uuid': uid})
-        if not ret:
-            ret = await self.db.get_collection({'collection_name': uid})
+        ret = await self.get_collection_by_id(uid)
         if not ret:
             self.send_error(400, reason='Cannot find collection')
             return
 
-        files_kwargs = {
-            'query': json_decode(ret['query']),
-            'keys': ['uuid'],
-        }
-
         if self.request.body:
-            metadata = json_decode(self.request.body)
+            metadata = orjson.loads(self.request.body)
         else:
             metadata = {}
 
@@ -971,33 +1104,39 @@ class SingleCollectionSnapshotsHandler(CollectionBaseHandler):
             metadata['owner'] = ret['owner']
 
         # allow user-specified uuid, create if not found
-        if 'uuid' not in metadata:
-            metadata['uuid'] = str(uuid1())
+        user_uuid = 'uuid' in metadata
+        if not user_uuid:
+            metadata['uuid'] = str(uuid4())
 
         set_last_modification_date(metadata)
         metadata['creation_date'] = metadata['meta_modify_date']
         del metadata['meta_modify_date']
 
-        snapshot = await self.db.get_snapshot({'uuid': metadata['uuid']})
-
-        if snapshot:
+        # only a user-specified uuid is worth checking up front
+        # (a fresh uuid4 won't collide, and if it did, the unique index still rejects it below)
+        if user_uuid and await self.db.get_snapshot({'uuid': metadata['uuid']}, keys=['uuid']):
             # snapshot uuid already exists
             self.send_error(409, reason='Conflict with existing snapshot (uuid already exists)')
-        else:
-            # find the list of files
-            files = await self.db.find_files(**files_kwargs)
-            metadata['files'] = [row['uuid'] for row in files]
-            logger.warning('creating snapshot %s with files %r', metadata['uuid'], metadata['files'])
-            # create the snapshot
+            return
+
+        # find the list of files (sorted once here, since every `$in` lookup of them sorts them)
+        metadata['files'] = sorted(await self.db.find_file_uuids(_decoded_query(ret['query'])))
+        logger.warning('creating snapshot %s with files %r', metadata['uuid'], metadata['files'])
+        # create the snapshot
+        try:
             uuid = await self.db.create_snapshot(metadata)
-            self.set_status(201)
-            self.write({
-                '_links': {
-                    'self': {'href': os.path.join(self.collections_url, uid, 'snapshots')},
-                    'parent': {'href': os.path.join(self.collections_url, uid)},
-                },
-                'snapshot': os.path.join(self.snapshots_url, uuid),
-            })
+        except pymongo.errors.DuplicateKeyError:
+            # lost a race with a concurrent request
+            self.send_error(409, reason='Conflict with existing snapshot (uuid already exists)')
+            return
+        self.set_status(201)
+        self.write_json({
+            '_links': {
+                'self': {'href': f"{self.collections_url}/{uid}/snapshots"},
+                'parent': {'href': f"{self.collections_url}/{uid}"},
+            },
+            'snapshot': f"{self.snapshots_url}/{uuid}",
+        })
 
 
 # --------------------------------------------------------------------------------------
@@ -1010,15 +1149,23 @@ class SingleSnapshotHandler(CollectionBaseHandler):
     @catch_error
     async def get(self, uid: str) -> None:
         """Handle GET request."""
-        ret = await self.db.get_snapshot({'uuid': uid})
+        # look up first (usually an in-process cache hit), so a missing snapshot is a 404, not a 304
+        ret = await self.db.get_snapshot_by_uuid(uid)
 
         if ret:
+            # snapshots are immutable, so the uuid is a valid ETag (no need to hash the body)
+            self.set_header('Etag', f'"{uid}"')
+            if self.check_etag_header():
+                # the client already has this snapshot, so skip serializing it
+                self.set_status(304)
+                return
+
             ret['_links'] = {
-                'self': {'href': os.path.join(self.snapshots_url, uid)},
-                'parent': {'href': self.collections_url},
+                'self': {'href': f"{self.snapshots_url}/{uid}"},
+                'parent': self.links['collections'],
             }
 
-            self.write(ret)
+            self.write_json(ret)
         else:
             self.send_error(404, reason='Snapshot not found')
 
@@ -1033,7 +1180,7 @@ class SingleSnapshotFilesHandler(CollectionBaseHandler):
     @catch_error
     async def get(self, uid: str) -> None:
         """Handle GET request."""
-        ret = await self.db.get_snapshot({'uuid': uid})
+        ret = await self.db.get_snapshot_by_uuid(uid)
 
         if ret:
             try:
@@ -1043,19 +1190,17 @@ class SingleSnapshotFilesHandler(CollectionBaseHandler):
                 kwargs['query'] = {'uuid': {'$in': ret['files']}}
                 logger.warning('getting files: %r', kwargs['query'])
                 argbuilder.build_keys(kwargs)
-            except Exception:  # pylint: disable=W0703
+            except argbuilder.ARG_ERRORS:
                 logging.warning('query parameter error', exc_info=True)
                 self.send_error(400, reason='Invalid query parameter(s)')
                 return
 
-            files = await self.db.find_files(**kwargs)
-
-            self.write({
-                '_links': {
-                    'self': {'href': os.path.join(self.snapshots_url, uid, 'files')},
-                    'parent': {'href': os.path.join(self.snapshots_url, uid)},
+            await self.write_json_list(
+                {
+                    'self': {'href': f"{self.snapshots_url}/{uid}/files"},
+                    'parent': {'href': f"{self.snapshots_url}/{uid}"},
                 },
-                'files': files,
-            })
+                'files', self.db.stream_files(**kwargs),
+            )
         else:
             self.send_error(404, reason='Snapshot not found')
@@ -18,7 +18,6 @@ def get_type(val):
 
 
 def parse_one(key, value, ret, sym='['):
-    print('key',key,'value',value)
     if key == '[]':
         ret.append(value)
     else:
@@ -8,6 +8,7 @@ from __future__ import absolute_import, division, print_function
 import os
 import unittest
 
+import requests
 from rest_tools.client import RestClient
 
 from .test_files import hex
@@ -77,6 +78,36 @@ class TestCollectionsAPI(TestServerAPI):
             self.assertIn(k, data)
             self.assertEqual(metadata[k], data[k])
 
+    def test_22_collection_uuid_beats_name(self):
+        self.start_server()
+        token = self.get_token()
+        r = RestClient(self.address, token, timeout=1, retries=1)
+
+        metadata = {
+            'collection_name': 'blah',
+            'owner': 'foo',
+        }
+        data = r.request_seq('POST', '/api/collections', metadata)
+        uid = data['collection'].split('/')[-1]
+
+        # two more collections, both named after the first one's uuid (names aren't unique)
+        metadata2 = {
+            'collection_name': uid,
+            'owner': 'bar',
+        }
+        data = r.request_seq('POST', '/api/collections', metadata2)
+        uid2 = data['collection'].split('/')[-1]
+        r.request_seq('POST', '/api/collections', metadata2)
+
+        # the uuid match wins over the name match
+        data = r.request_seq('GET', '/api/collections/' + uid)
+        self.assertEqual(data['uuid'], uid)
+        self.assertEqual(data['owner'], 'foo')
+
+        data = r.request_seq('GET', '/api/collections/' + uid2)
+        self.assertEqual(data['uuid'], uid2)
+        self.assertEqual(data['owner'], 'bar')
+
     def test_30_collection_files(self):
         self.start_server()
         token = self.get_token()
@@ -116,6 +147,51 @@ class TestCollectionsAPI(TestServerAPI):
         self.assertEqual(data['files'][0]['uuid'], uid)
         self.assertEqual(data['files'][0]['checksum'], metadata['checksum'])
 
+    def test_31_collection_files_many(self):
+        # more files than `JSON_LIST_CHUNK_SIZE`, so the list is written in several chunks
+        self.start_server()
+        token = self.get_token()
+        r = RestClient(self.address, token, timeout=1, retries=1)
+
+        metadata = {
+            'collection_name': 'blah',
+            'owner': 'foo',
+        }
+        data = r.request_seq('POST', '/api/collections', metadata)
+        uid = data['collection'].split('/')[-1]
+
+        file_uids = set()
+        for i in range(300):
+            metadata = {
+                'logical_name': 'blah{}'.format(i),
+                'checksum': {'sha512':hex('foo bar {}'.format(i))},
+                'file_size': 1,
+                u'locations': [{u'site':u'test',u'path':u'blah{}.dat'.format(i)}]
+            }
+            data = r.request_seq('POST', '/api/files', metadata)
+            file_uids.add(data['file'].split('/')[-1])
+
+        data = r.request_seq('GET', '/api/collections/blah/files',
+                             {'keys':'uuid|logical_name'})
+        self.assertEqual(len(data['files']), 300)
+        self.assertEqual({f['uuid'] for f in data['files']}, file_uids)
+        self.assertEqual({f['logical_name'] for f in data['files']},
+                         {'blah{}'.format(i) for i in range(300)})
+
+        # pages across a chunk boundary
+        page1 = r.request_seq('GET', '/api/collections/blah/files', {'limit':260})['files']
+        page2 = r.request_seq('GET', '/api/collections/blah/files', {'limit':260, 'start':260})['files']
+        self.assertEqual(len(page1), 260)
+        self.assertEqual(len(page2), 40)
+        self.assertEqual({f['uuid'] for f in page1 + page2}, file_uids)
+
+        # same for a snapshot of the collection
+        data = r.request_seq('POST', '/api/collections/{}/snapshots'.format(uid))
+        snap_uid = data['snapshot'].split('/')[-1]
+        data = r.request_seq('GET', '/api/snapshots/{}/files'.format(snap_uid))
+        self.assertEqual(len(data['files']), 300)
+        self.assertEqual({f['uuid'] for f in data['files']}, file_uids)
+
     def test_70_snapshot_create(self):
         self.start_server()
         token = self.get_token()
@@ -208,6 +284,45 @@ class TestCollectionsAPI(TestServerAPI):
         self.assertEqual(data['files'][0]['uuid'], file_uid)
         self.assertEqual(data['files'][0]['checksum'], metadata['checksum'])
 
+    def test_72_snapshot_etag(self):
+        self.start_server()
+        token = self.get_token()
+        r = RestClient(self.address, token, timeout=1, retries=1)
+
+        metadata = {
+            'collection_name': 'blah',
+            'owner': 'foo',
+        }
+        data = r.request_seq('POST', '/api/collections', metadata)
+        uid = data['collection'].split('/')[-1]
+
+        data = r.request_seq('POST', '/api/collections/{}/snapshots'.format(uid))
+        snap_uid = data['snapshot'].split('/')[-1]
+
+        headers = {'Authorization': 'Bearer ' + token}
+        url = self.address + '/api/snapshots/' + snap_uid
+
+        # snapshots are immutable, so the uuid is the ETag
+        resp = requests.get(url, headers=headers)
+        resp.raise_for_status()
+        self.assertEqual(resp.headers['ETag'], '"{}"'.format(snap_uid))
+        self.assertEqual(resp.json()['uuid'], snap_uid)
+
+        # a matching If-None-Match gets a 304 (without a body)
+        resp = requests.get(url, headers={**headers, 'If-None-Match': '"{}"'.format(snap_uid)})
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp.content, b'')
+
+        # otherwise, the snapshot is sent again
+        resp = requests.get(url, headers={**headers, 'If-None-Match': '"something-else"'})
+        resp.raise_for_status()
+        self.assertEqual(resp.json()['uuid'], snap_uid)
+
+        # a snapshot that doesn't exist is a 404, even if the ETag "matches"
+        resp = requests.get(self.address + '/api/snapshots/not-a-snapshot',
+                            headers={**headers, 'If-None-Match': '"not-a-snapshot"'})
+        self.assertEqual(resp.status_code, 404)
+
 
 if __name__ == '__main__':
     suite = unittest.TestLoader().loadTestsFromTestCase(TestStringMethods)
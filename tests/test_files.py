@@ -1820,6 +1820,44 @@ class TestFilesAPI(TestServerAPI):
         self.assertIn(loc1c, rec2["locations"])
         self.assertNotIn(loc1d, rec2["locations"])
 
+    def test_75_post_files_replica_list_valued_location(self) -> None:
+        """Test that POST /api/files can add a replica next to a location
+        entry holding a list value."""
+        self.start_server()
+        token = self.get_token()
+        r = RestClient(self.address, token, timeout=1, retries=1)
+
+        loc1 = {'site': 'WIPAC', 'path': '/data/test/exp/IceCube/foo.dat', 'tags': ['t']}
+        loc2 = {'site': 'DESY', 'path': '/data/test/exp/IceCube/foo.dat'}
+
+        # create the file; should be OK
+        metadata = {
+            'uuid': 'replica-test-uuid',
+            'logical_name': '/blah/data/exp/IceCube/blah.dat',
+            'checksum': {'sha512': hex('foo bar')},
+            'file_size': 1,
+            u'locations': [loc1]
+        }
+        r.request_seq('POST', '/api/files', metadata)
+
+        # add a replica (same uuid & checksum, new location); should be OK
+        replica = copy.deepcopy(metadata)
+        replica['logical_name'] = '/blah/data/exp/IceCube/blah-replica.dat'
+        replica['locations'] = [loc2]
+        data = r.request_seq('POST', '/api/files', replica)
+        self.assertEqual(data['file'].split('/')[-1], metadata['uuid'])
+
+        rec = r.request_seq('GET', '/api/files/' + metadata['uuid'])
+        self.assertIn(loc1, rec['locations'])
+        self.assertIn(loc2, rec['locations'])
+
+        # add the same replica again; should NOT be OK
+        replica['logical_name'] = '/blah/data/exp/IceCube/blah-replica2.dat'
+        replica['locations'] = [loc1]
+        with self.assertRaises(Exception) as cm:
+            r.request_seq('POST', '/api/files', replica)
+        self.assertEqual(cm.exception.response.status_code, 409)  # type: ignore[attr-defined]
+
 
 if __name__ == '__main__':
     suite = unittest.TestLoader().loadTestsFromTestCase(TestStringMethods)
@@ -0,0 +1,230 @@
+"""Test mongo.py functions that don't need a running MongoDB."""
+
+# pylint: disable=W0212
+
+import asyncio
+import gc
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Tuple
+
+import pymongo.errors  # type: ignore[import]
+import pytest
+
+from file_catalog import mongo as mongo_module
+from file_catalog.mongo import Mongo, PartialUpdateError
+
+
+def _run_with_snapshots(
+    snapshots: Dict[str, Dict[str, Any]], max_files: int, uuids: List[str]
+) -> Tuple[Mongo, List[Optional[Dict[str, Any]]], List[str]]:
+    """Call `get_snapshot_by_uuid()` for each uuid, with a fake DB lookup."""
+    db_reads: List[str] = []
+
+    async def go() -> Tuple[Mongo, List[Optional[Dict[str, Any]]]]:
+        mongo = Mongo(
+            host="localhost", authSource="admin", snapshot_cache_max_files=max_files
+        )
+
+        async def get_snapshot(filters: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+            db_reads.append(filters["uuid"])
+            return snapshots.get(filters["uuid"])
+
+        mongo.get_snapshot = get_snapshot  # type: ignore[assignment]
+        return mongo, [await mongo.get_snapshot_by_uuid(u) for u in uuids]
+
+    mongo, rets = asyncio.run(go())
+    return mongo, rets, db_reads
+
+
+def test_00_snapshot_cache_hit_returns_copy() -> None:
+    """Test that a cache hit doesn't hand out the cached dict itself."""
+    snapshots = {"a": {"uuid": "a", "files": ["f1", "f2"]}}
+    mongo, rets, db_reads = _run_with_snapshots(snapshots, 100, ["a", "a"])
+
+    assert db_reads == ["a"]  # second call was a hit
+    assert rets[0] == rets[1] == snapshots["a"]
+    assert rets[1] is not mongo._snapshot_cache["a"]
+
+    rets[1]["uuid"] = "mutated"  # type: ignore[index]
+    assert mongo._snapshot_cache["a"]["uuid"] == "a"
+
+
+def test_01_snapshot_cache_bounded_by_files() -> None:
+    """Test that eviction is driven by the total number of cached uuids."""
+    snapshots = {
+        "a": {"uuid": "a", "files": ["f"] * 4},
+        "b": {"uuid": "b", "files": ["f"] * 4},
+        "c": {"uuid": "c", "files": ["f"] * 4},
+        "huge": {"uuid": "huge", "files": ["f"] * 100},
+    }
+    # each costs len(files) + 1 = 5, so two fit in 10
+    mongo, _, db_reads = _run_with_snapshots(
+        snapshots, 10, ["a", "b", "a", "c", "a", "b", "huge", "huge", "missing"]
+    )
+
+    # "c" evicts "b" (LRU), not the recently-used "a"
+    assert db_reads == ["a", "b", "c", "b", "huge", "huge", "missing"]
+    assert list(mongo._snapshot_cache) == ["a", "b"]
+    assert mongo._snapshot_cache_files == 10
+
+
+def test_02_snapshot_cache_concurrent_misses() -> None:
+    """Test that concurrent misses for one uuid only count its cost once."""
+    snapshot = {"uuid": "a", "files": ["f"] * 4}
+
+    async def go() -> Mongo:
+        mongo = Mongo(host="localhost", authSource="admin", snapshot_cache_max_files=10)
+
+        async def get_snapshot(filters: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+            await asyncio.sleep(0)  # let the other miss start
+            return dict(snapshot)
+
+        mongo.get_snapshot = get_snapshot  # type: ignore[assignment]
+        rets = await asyncio.gather(
+            mongo.get_snapshot_by_uuid("a"), mongo.get_snapshot_by_uuid("a")
+        )
+        assert rets == [snapshot, snapshot]
+        return mongo
+
+    mongo = asyncio.run(go())
+    assert list(mongo._snapshot_cache) == ["a"]
+    assert mongo._snapshot_cache_files == 5
+
+
+def test_05_motor_client_shared_per_loop() -> None:
+    """Test that clients are shared within a loop, and not kept past their users."""
+
+    async def go() -> Tuple[Mongo, Mongo]:
+        return (
+            Mongo(host="localhost", authSource="admin"),
+            Mongo(host="localhost", authSource="admin"),
+        )
+
+    mongo1, mongo2 = asyncio.run(go())
+    assert mongo1.client.client is mongo2.client.client
+    mongo3, _ = asyncio.run(go())
+    assert mongo3.client.client is not mongo1.client.client  # another loop
+
+    del mongo1, mongo2, mongo3, _
+    gc.collect()
+    assert not mongo_module._CLIENT_CACHE
+
+
+class _FakeCollection:
+    """Just enough of a Motor collection for the index helpers."""
+
+    name = "files"
+
+    def __init__(self, indexes: Dict[str, Dict[str, Any]]) -> None:
+        self.indexes = indexes
+
+    @staticmethod
+    def _name(keys: List[Tuple[str, int]]) -> str:
+        return "_".join(f"{k}_{d}" for k, d in keys)
+
+    async def create_index(self, keys: List[Tuple[str, int]], **kwargs: Any) -> None:
+        name = self._name(keys)
+        if name in self.indexes and self.indexes[name] != kwargs:
+            raise pymongo.errors.OperationFailure("conflict", code=85)
+        self.indexes[name] = kwargs
+
+    async def drop_index(self, name_or_keys: Any) -> None:
+        name = name_or_keys
+        if not isinstance(name, str):
+            name = self._name(name_or_keys)
+        if name not in self.indexes:
+            raise pymongo.errors.OperationFailure("not found", code=27)
+        del self.indexes[name]
+
+
+def test_10_create_index_keeps_conflicting_index() -> None:
+    """Test that an index with other options is kept, not rebuilt."""
+    sparse = {"background": True, "sparse": True}
+    coll = _FakeCollection({"data_type_1": dict(sparse)})
+
+    asyncio.run(Mongo._create_index(coll, [("data_type", 1)], unique=True))
+    assert coll.indexes == {"data_type_1": sparse}
+
+    # unchanged options are a no-op
+    asyncio.run(Mongo._create_index(coll, [("data_type", 1)], sparse=True))
+    assert coll.indexes == {"data_type_1": sparse}
+
+
+def test_11_drop_index_tolerates_missing() -> None:
+    """Test that dropping an obsolete index is idempotent."""
+    coll = _FakeCollection({"logical_name_hashed": {}})
+
+    asyncio.run(Mongo._drop_index(coll, "logical_name_hashed"))
+    asyncio.run(Mongo._drop_index(coll, "logical_name_hashed"))
+    assert not coll.indexes
+
+
+class _FakeFiles:
+    """Just enough of the Motor `files` collection for the bulk helpers."""
+
+    def __init__(self, docs: List[Dict[str, Any]]) -> None:
+        self.docs = {d["uuid"]: d for d in docs}
+
+    async def insert_many(self, docs: List[Dict[str, Any]], ordered: bool = True) -> None:
+        assert not ordered
+        errors = []
+        for i, doc in enumerate(docs):
+            if doc["uuid"] in self.docs:
+                errors.append({"index": i, "code": 11000})
+            else:
+                self.docs[doc["uuid"]] = doc
+        if errors:
+            raise pymongo.errors.BulkWriteError({"writeErrors": errors})
+
+    async def bulk_write(self, requests: List[Any], ordered: bool = True) -> Any:
+        assert not ordered
+        matched = 0
+        for req in requests:
+            doc = self.docs.get(req._filter["uuid"])
+            if doc is not None:
+                doc.update(req._doc["$set"])
+                matched += 1
+        return SimpleNamespace(matched_count=matched)
+
+    async def distinct(self, key: str, filters: Dict[str, Any]) -> List[Any]:
+        return [d[key] for d in self.docs.values() if d["uuid"] in filters["uuid"]["$in"]]
+
+
+def _run_with_files(files: _FakeFiles, method: str, arg: Any) -> Any:
+    async def go() -> Any:
+        mongo = Mongo(host="localhost", authSource="admin")
+        mongo.client = SimpleNamespace(files=files)
+        return await getattr(mongo, method)(arg)
+
+    return asyncio.run(go())
+
+
+def test_20_create_files() -> None:
+    """Test that `create_files()` inserts all, and reports failed ones."""
+    files = _FakeFiles([])
+    assert _run_with_files(files, "create_files", []) == []
+
+    uuids = _run_with_files(files, "create_files", [{"uuid": "a"}, {"uuid": "b"}])
+    assert uuids == ["a", "b"]
+    assert set(files.docs) == {"a", "b"}
+
+    # unordered: "c" is inserted despite the duplicate before it
+    with pytest.raises(pymongo.errors.BulkWriteError) as exc:
+        _run_with_files(files, "create_files", [{"uuid": "a"}, {"uuid": "c"}])
+    assert [err["index"] for err in exc.value.details["writeErrors"]] == [0]
+    assert set(files.docs) == {"a", "b", "c"}
+
+
+def test_21_update_files() -> None:
+    """Test that `update_files()` updates all, and reports missing ones."""
+    files = _FakeFiles([{"uuid": "a", "x": 0}, {"uuid": "b", "x": 0}])
+    _run_with_files(files, "update_files", [])
+
+    _run_with_files(files, "update_files", [("a", {"x": 1}), ("b", {"x": 2})])
+    assert files.docs == {"a": {"uuid": "a", "x": 1}, "b": {"uuid": "b", "x": 2}}
+
+    # not atomic: "b" is updated even though "missing" isn't found
+    with pytest.raises(PartialUpdateError) as exc:
+        _run_with_files(files, "update_files", [("missing", {"x": 3}), ("b", {"x": 3})])
+    assert exc.value.missing == ["missing"]
+    assert files.docs["b"]["x"] == 3
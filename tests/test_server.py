@@ -5,6 +5,8 @@
 
 from __future__ import absolute_import, division, print_function
 
+import asyncio
+import collections
 import hashlib
 import os
 import random
@@ -18,9 +20,15 @@ from threading import Thread
 
 import requests
 from file_catalog.urlargparse import encode as jquery_encode
+import tornado.testing
+import tornado.web
+from file_catalog.mongo import Mongo
+from file_catalog.server import JSON_LIST_CHUNK_SIZE, APIHandler
 from pymongo import MongoClient
 from tornado.escape import json_decode, json_encode
+from tornado.httpclient import AsyncHTTPClient
 from tornado.ioloop import IOLoop
+from tornado.simple_httpclient import HTTPStreamClosedError
 
 
 class TestServerAPI(unittest.TestCase):
@@ -91,6 +99,115 @@ class TestServerAPI(unittest.TestCase):
         r.raise_for_status()
 
 
+class _HeldHandler(APIHandler):
+    """Holds each request open until `release` is set."""
+    release = None
+
+    async def get(self):
+        await self.release.wait()
+        self.write('ok')
+
+
+class TestRateLimit(tornado.testing.AsyncHTTPTestCase):
+    """Rate limiting, in-process (no mongod needed)."""
+
+    def get_app(self):
+        self.rate_limit_data = collections.Counter()
+        args = {
+            'config': {},
+            'db': Mongo(host='localhost', authSource='admin'),
+            'rate_limit': 10,
+            'rate_limit_data': self.rate_limit_data,
+        }
+        return tornado.web.Application([(r'/held', _HeldHandler, args)])
+
+    def get_http_client(self):
+        # the default client only has 10 connections, too few to exceed the limit
+        return AsyncHTTPClient(force_instance=True, max_clients=20)
+
+    async def _wait_for_count(self, count):
+        for _ in range(100):
+            if self.rate_limit_data['127.0.0.1'] == count:
+                return
+            await asyncio.sleep(.01)
+        self.fail(f'rate limit count is {self.rate_limit_data["127.0.0.1"]}, not {count}')
+
+    @tornado.testing.gen_test
+    async def test_10_rate_limit_exceeded(self):
+        _HeldHandler.release = asyncio.Event()
+        held = [asyncio.ensure_future(self.http_client.fetch(self.get_url('/held'), raise_error=False))
+                for _ in range(10)]
+        await self._wait_for_count(10)
+
+        r = await self.http_client.fetch(self.get_url('/held'), raise_error=False)
+        self.assertEqual(r.code, 429)
+        self.assertEqual(self.rate_limit_data['127.0.0.1'], 10)  # rejected request isn't counted
+
+        _HeldHandler.release.set()
+        for r in await asyncio.gather(*held):
+            self.assertEqual(r.code, 200)
+        await self._wait_for_count(0)
+
+    @tornado.testing.gen_test
+    async def test_11_rate_limit_count_returns_to_zero(self):
+        _HeldHandler.release = asyncio.Event()
+        _HeldHandler.release.set()
+        r = await self.http_client.fetch(self.get_url('/held'))
+        self.assertEqual(r.code, 200)
+        await self._wait_for_count(0)
+
+        # a rejected request (counter pre-filled to the limit) must not decrement the count
+        self.rate_limit_data['127.0.0.1'] = 10
+        r = await self.http_client.fetch(self.get_url('/held'), raise_error=False)
+        self.assertEqual(r.code, 429)
+        self.assertEqual(self.rate_limit_data['127.0.0.1'], 10)
+        self.rate_limit_data['127.0.0.1'] = 0
+
+        r = await self.http_client.fetch(self.get_url('/held'))
+        self.assertEqual(r.code, 200)
+        await self._wait_for_count(0)
+
+
+class _FailingListHandler(APIHandler):
+    """Writes a list of `n` items, then fails like a dead cursor."""
+
+    async def get(self, n):
+        async def items():
+            for i in range(int(n)):
+                yield {'i': i}
+            raise Exception('cursor died')
+        await self.write_json_list({'self': {'href': '/list'}}, 'files', items())
+
+
+class TestWriteJsonList(tornado.testing.AsyncHTTPTestCase):
+    """Errors while streaming a list, in-process (no mongod needed)."""
+
+    def get_app(self):
+        self.rate_limit_data = collections.Counter()
+        args = {
+            'config': {},
+            'db': Mongo(host='localhost', authSource='admin'),
+            'rate_limit_data': self.rate_limit_data,
+        }
+        return tornado.web.Application([(r'/list/(\d+)', _FailingListHandler, args)])
+
+    @tornado.testing.gen_test
+    async def test_10_error_before_flush(self):
+        # nothing flushed yet (at most one chunk is buffered), so a normal error response
+        for n in (0, JSON_LIST_CHUNK_SIZE + 1):
+            r = await self.http_client.fetch(self.get_url(f'/list/{n}'), raise_error=False)
+            self.assertEqual(r.code, 500)
+        self.assertEqual(self.rate_limit_data['127.0.0.1'], 0)
+
+    @tornado.testing.gen_test
+    async def test_11_error_after_flush(self):
+        # the 200 is already sent, so the response must not end like a complete one
+        with self.assertRaises(HTTPStreamClosedError):
+            await self.http_client.fetch(self.get_url(f'/list/{2 * JSON_LIST_CHUNK_SIZE + 1}'),
+                                         raise_error=False)
+        self.assertEqual(self.rate_limit_data['127.0.0.1'], 0)
+
+
 if __name__ == '__main__':
     suite = unittest.TestLoader().loadTestsFromTestCase(TestStringMethods)
     unittest.TextTestRunner(verbosity=2).run(suite)